@@ -1,14 +1,25 @@
 import requests
-import random
-import emoji
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import argparse
 import os
+import re
 import sys
 import logging
-from bs4 import BeautifulSoup
+import threading
+import time
+import lxml.etree
+import lxml.html
+import orjson
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from datetime import datetime
 from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
 import traceback
 
 # ====== Setup logging ======
@@ -22,6 +33,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Internal JSON endpoint behind Pinterest's search page
+SEARCH_API_URL = "https://www.pinterest.com/resource/BaseSearchResource/get/"
+
+# Every candidate pin selector, matched in a single walk over the document
+_PIN_XPATH = '//img[@src] | //div[@data-test-id="pin"]'
+
+# lxml parsers must not be shared between threads, so each worker keeps its own
+_html_local = threading.local()
+
+# Title decorations: sparkles, fire, bulb, or nothing
+EMOJIS = ("✨", "🔥", "💡", "")
+
+# Keyword cleanup tables for generated links and output filenames
+_KEYWORD_URL_RE = re.compile(r"[ &+]")
+_KEYWORD_URL_MAP = {" ": "-", "&": "and", "+": "plus"}
+_KEYWORD_FILENAME_TABLE = str.maketrans(" ", "_")
+
+# Dedicated generator for batched random draws, independent of global state
+_rng = np.random.default_rng()
+
 def validate_date(date_string):
     """Validate and parse date string."""
     try:
@@ -30,6 +61,10 @@ def validate_date(date_string):
         logger.error(f"Invalid date format: {date_string}. Please use YYYY-MM-DD format.")
         return None
 
+def slugify_keyword(keyword):
+    """Clean a keyword for use in a URL path in a single pass."""
+    return _KEYWORD_URL_RE.sub(lambda m: _KEYWORD_URL_MAP[m.group(0)], keyword)
+
 def create_output_directory():
     """Create output directory safely."""
     try:
@@ -40,115 +75,267 @@ def create_output_directory():
         logger.error(f"Failed to create output directory: {e}")
         return False
 
-def get_pinterest_pins(keyword, num_pages, headers):
-    """Scrape Pinterest pins with error handling."""
+def create_session(headers):
+    """Create a pooled HTTP session with keep-alive and retries."""
+    session = requests.Session()
+    session.headers.update(headers)
+    
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+class RateLimiter:
+    """Space out request starts by a minimum interval across threads."""
+    
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_request_time = 0.0
+    
+    def wait(self):
+        """Block only as long as needed to honor the minimum interval."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self.min_interval - (now - self._last_request_time))
+            self._last_request_time = now + delay
+        if delay:
+            time.sleep(delay)
+
+def _get_html_tools():
+    """Return this thread's reusable HTML parser and compiled pin XPath."""
+    if not hasattr(_html_local, "parser"):
+        _html_local.parser = lxml.html.HTMLParser()
+        _html_local.pin_xpath = lxml.etree.XPath(_PIN_XPATH)
+    return _html_local.parser, _html_local.pin_xpath
+
+def _fetch_page(session, base_url, keyword, page, limiter):
+    """Scrape a single Pinterest search page and return its pins."""
+    try:
+        url = base_url + str(page)
+        
+        logger.info("Scraping page %s for keyword: %s", page, keyword)
+        logger.info("URL: %s", url)
+        
+        # 429 responses are retried by the session adapter, honoring Retry-After
+        limiter.wait()
+        response = session.get(url, timeout=30)
+        logger.info("Response status: %s", response.status_code)
+        logger.info("Content encoding: %s", response.headers.get("content-encoding", "identity"))
+        
+        if response.status_code != 200:
+            logger.warning("Page %s returned status %s", page, response.status_code)
+            return []
+        
+        parser, pin_xpath = _get_html_tools()
+        tree = lxml.html.fromstring(response.content, parser=parser)
+        nodes = pin_xpath(tree)
+        pins = [node for node in nodes if node.tag == "img"]
+        logger.info("Found %d img tags on page %s", len(pins), page)
+        
+        if not pins:
+            logger.warning("No pins found on page %s", page)
+            logger.info("Alternative search found %d pin divs", len(nodes))
+            return []
+            
+        page_results = []
+        for i, pin in enumerate(pins):
+            try:
+                title = pin.get("alt", f"{keyword} idea {i}")
+                img_src = pin.get("src", "")
+                
+                # Filter out non-image URLs and validate image URLs
+                if img_src and (img_src.startswith("http") or img_src.startswith("//")):
+                    page_results.append({
+                        "title": title.strip() if title else f"{keyword} idea {i}",
+                        "img": img_src
+                    })
+            except Exception as e:
+                logger.warning("Error processing pin %s on page %s: %s", i, page, e)
+                continue
+        
+        logger.info("Successfully scraped %d pins from page %s", len(page_results), page)
+        return page_results
+        
+    except requests.exceptions.RequestException as e:
+        logger.error("Network error on page %s: %s", page, e)
+        return []
+    except Exception as e:
+        logger.error("Unexpected error on page %s: %s", page, e)
+        # Formatting a traceback is costly, so only do it when it will be shown
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Traceback: %s", traceback.format_exc())
+        return []
+
+def _fetch_api_pins(session, keyword, num_pages, limiter):
+    """Fetch pins from Pinterest's JSON search resource, following bookmarks."""
     results = []
+    bookmark = None
+    
+    # Only the bookmark changes between pages
+    source_url = f"/search/pins/?q={quote_plus(keyword)}"
+    api_headers = {"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"}
     
     for page in range(1, num_pages + 1):
         try:
-            # URL encode the keyword properly
-            encoded_keyword = quote_plus(keyword)
-            url = f"https://www.pinterest.com/search/pins/?q={encoded_keyword}&page={page}"
+            options = {"query": keyword, "scope": "pins"}
+            if bookmark:
+                options["bookmarks"] = [bookmark]
+            params = {
+                "source_url": source_url,
+                "data": orjson.dumps({"options": options, "context": {}}).decode()
+            }
             
-            logger.info(f"Scraping page {page} for keyword: {keyword}")
-            logger.info(f"URL: {url}")
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            logger.info(f"Response status: {response.status_code}")
+            logger.info("Fetching API page %s for keyword: %s", page, keyword)
+            limiter.wait()
+            response = session.get(
+                SEARCH_API_URL,
+                params=params,
+                headers=api_headers,
+                timeout=30
+            )
             
             if response.status_code != 200:
-                logger.warning(f"Page {page} returned status {response.status_code}")
-                continue
-            
-            soup = BeautifulSoup(response.text, "html.parser")
+                logger.warning("API page %s returned status %s", page, response.status_code)
+                break
             
-            # Look for pins in multiple possible selectors
-            pins = soup.find_all("img", {"src": True})
-            logger.info(f"Found {len(pins)} img tags on page {page}")
+            resource_response = orjson.loads(response.content).get("resource_response") or {}
+            items = (resource_response.get("data") or {}).get("results") or []
             
-            if not pins:
-                logger.warning(f"No pins found on page {page}")
-                # Try alternative selectors
-                pins = soup.find_all("div", {"data-test-id": "pin"})
-                logger.info(f"Alternative search found {len(pins)} pin divs")
-                continue
-                
             page_results = []
-            for i, pin in enumerate(pins):
+            for i, item in enumerate(items):
                 try:
-                    title = pin.get("alt", f"{keyword} idea {i}")
-                    img_src = pin.get("src", "")
+                    img_src = ((item.get("images") or {}).get("orig") or {}).get("url")
+                    if not isinstance(img_src, str) or not img_src:
+                        continue
                     
-                    # Filter out non-image URLs and validate image URLs
-                    if img_src and (img_src.startswith("http") or img_src.startswith("//")):
-                        page_results.append({
-                            "title": title.strip() if title else f"{keyword} idea {i}",
-                            "img": img_src
-                        })
+                    title = item.get("grid_title") or item.get("title")
+                    if not isinstance(title, str) or not title.strip():
+                        title = f"{keyword} idea {i}"
+                    page_results.append({"title": title.strip(), "img": img_src})
                 except Exception as e:
-                    logger.warning(f"Error processing pin {i} on page {page}: {e}")
+                    logger.warning("Error processing API pin %s on page %s: %s", i, page, e)
                     continue
             
             results.extend(page_results)
-            logger.info(f"Successfully scraped {len(page_results)} pins from page {page}")
+            logger.info("Successfully fetched %d pins from API page %s", len(page_results), page)
+            
+            # Each page of the search resource is keyed off the previous one
+            bookmark = resource_response.get("bookmark")
+            if not bookmark or bookmark == "-end-":
+                break
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"Network error on page {page}: {e}")
-            continue
-        except Exception as e:
-            logger.error(f"Unexpected error on page {page}: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            continue
+            logger.error("Network error on API page %s: %s", page, e)
+            break
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.warning("Unexpected API response on page %s: %s", page, e)
+            break
+    
+    return results
+
+def _fetch_html_pins(session, keyword, num_pages, limiter, max_workers):
+    """Scrape pins from search result HTML pages concurrently."""
+    # URL encode the keyword once; only the page number varies per request
+    base_url = f"https://www.pinterest.com/search/pins/?q={quote_plus(keyword)}&page="
+    
+    # Pages are independent, so fetch them in parallel over the shared session
+    with ThreadPoolExecutor(max_workers=min(num_pages, max_workers)) as executor:
+        futures = [
+            executor.submit(_fetch_page, session, base_url, keyword, page, limiter)
+            for page in range(1, num_pages + 1)
+        ]
+        # Collect in page order so scheduled dates stay deterministic
+        return [pin for future in futures for pin in future.result()]
+
+def get_pinterest_pins(keyword, num_pages, session, max_workers=8, min_interval=0.25):
+    """Scrape Pinterest pins with error handling, preferring the JSON API."""
+    results = []
+    limiter = RateLimiter(min_interval)
+    
+    pins = _fetch_api_pins(session, keyword, num_pages, limiter)
+    if not pins:
+        logger.warning("JSON search API returned no pins, falling back to HTML scraping")
+        pins = _fetch_html_pins(session, keyword, num_pages, limiter, max_workers)
+    
+    # Drop pins whose image URL was already seen
+    seen = set()
+    for pin in pins:
+        if pin["img"] not in seen:
+            seen.add(pin["img"])
+            results.append(pin)
     
     return results
 
 def process_data(results, keyword, board, domain, start_date):
-    """Process scraped data with error handling."""
+    """Process scraped data into a dict of output columns with error handling."""
     if not results:
         logger.error("No results to process")
         return None
     
-    data = []
-    emojis = [emoji.emojize(":sparkles:"), emoji.emojize(":fire:"), emoji.emojize(":bulb:"), ""]
-    
-    for i, item in enumerate(results):
-        try:
-            em = random.choice(emojis)
-            rand_num = random.randint(1, 999)
-            final_title = f"{item['title']} {em} {rand_num}"
-            scheduled_date = start_date + timedelta(days=i)
-            
-            # Clean and validate the keyword for URL
-            clean_keyword = keyword.replace(' ', '-').replace('&', 'and').replace('+', 'plus')
-            
-            data.append({
-                "title": final_title,
-                "description": f"{keyword} inspiration {i+1}",
-                "image_url": item["img"],
-                "scheduled_date": scheduled_date.strftime("%Y-%m-%d"),
-                "keyword": keyword,
-                "board": board,
-                "domain_link": f"https://{domain}/{clean_keyword}-{i+1}"
-            })
-        except Exception as e:
-            logger.warning(f"Error processing item {i}: {e}")
-            continue
-    
-    return data
+    try:
+        n = len(results)
+        
+        # Draw all random decorations in one shot instead of per row
+        ems = _rng.choice(EMOJIS, size=n)
+        rand_nums = _rng.integers(1, 1000, size=n).astype(str)
+        row_nums = pd.Series(np.arange(1, n + 1)).astype(str)
+        
+        # Clean and validate the keyword for URL
+        clean_keyword = slugify_keyword(keyword)
+        
+        titles = pd.Series([item["title"] for item in results])
+        
+        # Constant columns are categorical so pyarrow writes them dictionary-encoded
+        constant_codes = np.zeros(n, dtype=np.int8)
+        
+        return {
+            "title": titles + " " + ems + " " + rand_nums,
+            "description": f"{keyword} inspiration " + row_nums,
+            "image_url": [item["img"] for item in results],
+            "scheduled_date": pd.date_range(start_date, periods=n, freq="D").strftime("%Y-%m-%d"),
+            "keyword": pd.Categorical.from_codes(constant_codes, categories=[keyword]),
+            "board": pd.Categorical.from_codes(constant_codes, categories=[board]),
+            "domain_link": f"https://{domain}/{clean_keyword}-" + row_nums
+        }
+    except Exception as e:
+        logger.error(f"Error processing data: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return None
 
-def save_csv_chunks(df, keyword, rows_per_file):
-    """Save data to CSV chunks with error handling."""
+def save_csv_chunks(df, keyword, rows_per_file, output_format="csv"):
+    """Save data to CSV, Parquet or Feather chunks with error handling."""
     try:
-        chunks = [df[i:i+rows_per_file] for i in range(0, df.shape[0], rows_per_file)]
+        num_chunks = 0
+        file_prefix = keyword.translate(_KEYWORD_FILENAME_TABLE)
         
-        for idx, chunk in enumerate(chunks):
-            filename = f"output/{keyword.replace(' ', '_')}_part{idx+1}.csv"
-            chunk.to_csv(filename, index=False, encoding='utf-8')
-            logger.info(f"💾 Saved {filename} with {len(chunk)} rows")
+        # Slice and write one chunk at a time so only one is alive at once
+        for idx, start in enumerate(range(0, len(df), rows_per_file)):
+            chunk = df.iloc[start:start + rows_per_file]
+            filename = f"output/{file_prefix}_part{idx+1}.{output_format}"
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
             
-        return len(chunks)
+            if output_format == "parquet":
+                # Dictionary-encode the columns that repeat on every row
+                pq.write_table(table, filename, compression="zstd",
+                               use_dictionary=["keyword", "board"])
+            elif output_format == "feather":
+                feather.write_feather(table, filename)
+            else:
+                # PyArrow's C++ writer emits UTF-8 and is much faster than DataFrame.to_csv;
+                # unlike pandas it quotes every string field and the header row
+                pacsv.write_csv(table, filename)
+            logger.info("💾 Saved %s with %d rows", filename, len(chunk))
+            num_chunks += 1
+            
+        return num_chunks
     except Exception as e:
-        logger.error(f"Error saving CSV files: {e}")
+        logger.error(f"Error saving {output_format} files: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         return 0
 
@@ -163,9 +350,15 @@ def main():
         parser.add_argument("--start_date", required=True, help="Start date in YYYY-MM-DD format")
         parser.add_argument("--pages", type=int, default=3, help="Number of pages to scrape (default: 3)")
         parser.add_argument("--rows_per_file", type=int, default=200, help="Rows per CSV file (default: 200)")
+        parser.add_argument("--format", choices=["csv", "parquet", "feather"], default="csv",
+                            help="Output file format (default: csv)")
+        parser.add_argument("--debug", action="store_true", help="Enable debug logging, including per-page tracebacks")
         
         args = parser.parse_args()
         
+        if args.debug:
+            logger.setLevel(logging.DEBUG)
+        
         # Validate inputs
         keyword = args.keyword.strip()
         board = args.board.strip()
@@ -183,6 +376,7 @@ def main():
         logger.info(f"Target board: {board}, Domain: {domain}")
         logger.info(f"Start date: {start_date.strftime('%Y-%m-%d')}")
         logger.info(f"Pages to scrape: {num_pages}, Rows per file: {rows_per_file}")
+        logger.info(f"Output format: {args.format}")
         
         # Create output directory
         if not create_output_directory():
@@ -194,7 +388,11 @@ def main():
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         
-        results = get_pinterest_pins(keyword, num_pages, headers)
+        session = create_session(headers)
+        try:
+            results = get_pinterest_pins(keyword, num_pages, session)
+        finally:
+            session.close()
         
         if not results:
             logger.warning("No pins were scraped. Creating sample data for testing...")
@@ -209,22 +407,22 @@ def main():
         logger.info(f"Total results to process: {len(results)}")
         
         # ====== Step 2: Clean & Generate ======
-        data = process_data(results, keyword, board, domain, start_date)
+        columns = process_data(results, keyword, board, domain, start_date)
         
-        if not data:
+        if not columns:
             logger.error("No data to process. Exiting.")
             sys.exit(1)
         
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(columns, copy=False)
         logger.info(f"Processed {len(df)} data entries")
         
-        # ====== Step 3: Split into CSV chunks ======
-        num_files = save_csv_chunks(df, keyword, rows_per_file)
+        # ====== Step 3: Split into output chunks ======
+        num_files = save_csv_chunks(df, keyword, rows_per_file, args.format)
         
         if num_files > 0:
-            logger.info(f"✅ Successfully completed! Created {num_files} CSV files in output/ directory")
+            logger.info(f"✅ Successfully completed! Created {num_files} {args.format} files in output/ directory")
         else:
-            logger.error("Failed to save CSV files")
+            logger.error(f"Failed to save {args.format} files")
             sys.exit(1)
             
     except KeyboardInterrupt:
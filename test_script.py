@@ -20,10 +20,10 @@ def test_imports():
         return False
     
     try:
-        import beautifulsoup4
-        logger.info("✅ beautifulsoup4 imported successfully")
+        import lxml.html
+        logger.info("✅ lxml imported successfully")
     except ImportError as e:
-        logger.error(f"❌ Failed to import beautifulsoup4: {e}")
+        logger.error(f"❌ Failed to import lxml: {e}")
         return False
     
     try:
@@ -34,10 +34,24 @@ def test_imports():
         return False
     
     try:
-        import emoji
-        logger.info("✅ emoji imported successfully")
+        import numpy
+        logger.info("✅ numpy imported successfully")
     except ImportError as e:
-        logger.error(f"❌ Failed to import emoji: {e}")
+        logger.error(f"❌ Failed to import numpy: {e}")
+        return False
+    
+    try:
+        import pyarrow
+        logger.info("✅ pyarrow imported successfully")
+    except ImportError as e:
+        logger.error(f"❌ Failed to import pyarrow: {e}")
+        return False
+    
+    try:
+        import orjson
+        logger.info("✅ orjson imported successfully")
+    except ImportError as e:
+        logger.error(f"❌ Failed to import orjson: {e}")
         return False
     
     return True